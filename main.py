@@ -1,185 +1,298 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List
+import asyncio
+import logging
+from aiocache import SimpleMemoryCache
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text, tuple_, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from typing import Optional
+from uuid import UUID
 import models, schemas
-from database import SessionLocal, engine, get_db
+from database import POOL_SIZE, engine, get_db
 from models import EntryType
 
-# 1. Create tables
-models.Base.metadata.create_all(bind=engine)
+# orjson's C encoder handles the datetime/uuid-heavy ledger payloads far faster than stdlib json
+app = FastAPI(title="Double-Entry Ledger API", default_response_class=ORJSONResponse)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Double-Entry Ledger API")
+# --- SQL ---
+# Built once at import so hot paths reuse the same TextClause instead of re-parsing per request.
+
+# Both RECORD_* statements also fold their ledger entries into account_daily_delta. The day is
+# taken from each entry's own created_at (via RETURNING), so the rollup always agrees with the
+# ledger and the 0003 backfill, even for a write that straddles UTC midnight.
+
+# Transaction header, its single ledger entry (deposits, withdrawals) and the daily rollup
+# in one round trip
+RECORD_SINGLE_ENTRY_SQL = text("""
+    WITH tx AS (
+        INSERT INTO transactions (type, description, status)
+        VALUES (:tx_type, :description, 'COMPLETED')
+        RETURNING id
+    ), entry AS (
+        INSERT INTO ledger_entries (account_id, transaction_id, entry_type, amount)
+        SELECT :account_id, id, :entry_type, :amount FROM tx
+        RETURNING account_id, created_at,
+                  CASE entry_type WHEN 'CREDIT' THEN amount ELSE -amount END AS delta
+    )
+    INSERT INTO account_daily_delta (account_id, day, net_delta)
+    SELECT account_id, created_at::date, delta FROM entry
+    ON CONFLICT (account_id, day)
+    DO UPDATE SET net_delta = account_daily_delta.net_delta + EXCLUDED.net_delta
+""")
+
+# Transaction header, both transfer legs and the daily rollup in one round trip. The legs are
+# grouped first so a self-transfer doesn't touch the same rollup row twice in one ON CONFLICT.
+RECORD_TRANSFER_SQL = text("""
+    WITH tx AS (
+        INSERT INTO transactions (type, description, status)
+        VALUES ('TRANSFER', :description, 'COMPLETED')
+        RETURNING id
+    ), debit AS (
+        INSERT INTO ledger_entries (account_id, transaction_id, entry_type, amount)
+        SELECT :source_id, id, 'DEBIT', :amount FROM tx
+        RETURNING account_id, created_at, -amount AS delta
+    ), credit AS (
+        INSERT INTO ledger_entries (account_id, transaction_id, entry_type, amount)
+        SELECT :destination_id, id, 'CREDIT', :amount FROM tx
+        RETURNING account_id, created_at, amount AS delta
+    ), rollup AS (
+        INSERT INTO account_daily_delta (account_id, day, net_delta)
+        SELECT account_id, created_at::date, SUM(delta)
+        FROM (SELECT * FROM debit UNION ALL SELECT * FROM credit) AS legs
+        GROUP BY account_id, created_at::date
+        ON CONFLICT (account_id, day)
+        DO UPDATE SET net_delta = account_daily_delta.net_delta + EXCLUDED.net_delta
+    )
+    SELECT id FROM tx
+""")
+
+INTEGRITY_SNAPSHOT_SQL = text(f"""
+    SELECT net_sum, unbalanced, drifted, refreshed_at
+    FROM {models.INTEGRITY_VIEW}
+""")
+
+REFRESH_INTEGRITY_SQL = text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {models.INTEGRITY_VIEW}")
+
+PING_SQL = text("SELECT 1")
+
+# Schema is managed by Alembic (`alembic upgrade head`), not created at startup
+
+@app.on_event("startup")
+async def warm_connection_pool():
+    """Opens POOL_SIZE connections up front so early requests skip the connect handshake."""
+    async def checkout():
+        conn = await engine.connect()
+        await conn.execute(PING_SQL)
+        return conn
+
+    # Hold them all at once; checking out sequentially would just reuse the same connection
+    conns = await asyncio.gather(*(checkout() for _ in range(POOL_SIZE)))
+    for conn in conns:
+        await conn.close()
+
+# Balance changes must run in the same transaction as the ledger insert that justifies them.
+# Each is a single UPDATE ... RETURNING: it takes the row lock and writes in one round trip.
+
+async def apply_balance_delta(db: AsyncSession, account_id: UUID, delta: int, not_found: str = "Account not found"):
+    # Overdrafts are rejected by the ck_accounts_nonneg_balance CHECK constraint, which
+    # surfaces as an IntegrityError and is mapped to 422 by integrity_error_handler.
+    updated = (await db.execute(
+        update(models.Account)
+        .where(models.Account.id == account_id)
+        .values(balance=models.Account.balance + delta)
+        .returning(models.Account.id)
+    )).scalar_one_or_none()
+    if updated is None:
+        raise HTTPException(status_code=404, detail=not_found)
+
+@app.exception_handler(IntegrityError)
+async def integrity_error_handler(request: Request, exc: IntegrityError):
+    # The transaction has already been rolled back by the `async with db.begin()` block
+    if models.NONNEG_BALANCE_CONSTRAINT in str(exc.orig):
+        detail = "Insufficient funds"
+    else:
+        detail = "Request violates a ledger constraint"
+    return ORJSONResponse(status_code=422, content={"detail": detail})
+
+# SQLSTATE numeric_value_out_of_range. asyncpg surfaces it as a bare DBAPIError, not DataError
+NUMERIC_OUT_OF_RANGE = "22003"
+
+@app.exception_handler(DBAPIError)
+async def numeric_range_error_handler(request: Request, exc: DBAPIError):
+    # Each amount fits a BIGINT (RequestAmount), but balance + amount can still overflow one
+    if getattr(exc.orig, "sqlstate", None) != NUMERIC_OUT_OF_RANGE:
+        raise exc
+    return ORJSONResponse(status_code=422, content={"detail": "Amount out of range"})
 
 # --- ACCOUNT ENDPOINTS ---
 
+# Read-heavy callers (dashboards) poll account details; a short TTL trades up to a second of
+# staleness for collapsing repeated lookups into one DB hit. Writes invalidate touched accounts.
+ACCOUNT_CACHE_TTL_SECONDS = 1
+account_cache = SimpleMemoryCache(namespace="account:")
+
+async def invalidate_accounts(*account_ids: UUID):
+    """Call after the write has committed. This is best-effort: a read that loaded the old row
+    before the commit can still cache it after this delete, so staleness is bounded only by
+    ACCOUNT_CACHE_TTL_SECONDS."""
+    for account_id in account_ids:
+        await account_cache.delete(str(account_id))
+
 @app.post("/accounts", response_model=schemas.AccountResponse)
-def create_new_account(account: schemas.AccountCreate, db: Session = Depends(get_db)):
+async def create_new_account(account: schemas.AccountCreate, db: AsyncSession = Depends(get_db)):
     db_account = models.Account(
         user_id=account.user_id,
         account_type=account.account_type,
         currency=account.currency
     )
     db.add(db_account)
-    db.commit()
-    db.refresh(db_account)
-    return {**db_account.__dict__, "balance": 0.00}
+    await db.commit()
+    await db.refresh(db_account)
+    return schemas.AccountResponse.model_validate(db_account)
 
 @app.get("/accounts/{account_id}", response_model=schemas.AccountResponse)
-def get_account_details(account_id: str, db: Session = Depends(get_db)):
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
+async def get_account_details(account_id: UUID, db: AsyncSession = Depends(get_db)):
+    cached = await account_cache.get(str(account_id))
+    if cached is not None:
+        return cached
+
+    account = (await db.execute(
+        select(models.Account).where(models.Account.id == account_id)
+    )).scalar_one_or_none()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
-    
-    balance_query = text("""
-        SELECT COALESCE(SUM(CASE WHEN entry_type = 'CREDIT' THEN amount ELSE -amount END), 0)
-        FROM ledger_entries
-        WHERE account_id = :acc_id
-    """)
-    current_balance = db.execute(balance_query, {"acc_id": account_id}).scalar()
-    
-    return {
-        "id": account.id,
-        "user_id": account.user_id,
-        "account_type": account.account_type,
-        "currency": account.currency,
-        "status": account.status,
-        "balance": current_balance
-    }
+
+    details = schemas.AccountResponse.model_validate(account)
+    await account_cache.set(str(account_id), details, ttl=ACCOUNT_CACHE_TTL_SECONDS)
+    return details
 
 # --- LEDGER HISTORY ENDPOINT ---
 
-@app.get("/accounts/{account_id}/ledger", response_model=List[schemas.LedgerEntryResponse])
-def get_ledger_history(account_id: str, db: Session = Depends(get_db)):
-    entries = db.query(models.LedgerEntry)\
-        .filter(models.LedgerEntry.account_id == account_id)\
-        .order_by(models.LedgerEntry.created_at.desc())\
-        .all()
-    return entries
+@app.get("/accounts/{account_id}/ledger", response_model=schemas.LedgerPage)
+async def get_ledger_history(
+    account_id: UUID,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    # Keyset pagination: a bounded range scan on ix_ledger_acct_created regardless of history size
+    query = select(models.LedgerEntry)\
+        .where(models.LedgerEntry.account_id == account_id)\
+        .order_by(models.LedgerEntry.created_at.desc(), models.LedgerEntry.id.desc())\
+        .limit(limit)
+    if cursor is not None:
+        try:
+            cursor_created_at, cursor_id = schemas.decode_ledger_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+        query = query.where(
+            tuple_(models.LedgerEntry.created_at, models.LedgerEntry.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    entries = (await db.execute(query)).scalars().all()
+    next_cursor = None
+    if len(entries) == limit:
+        next_cursor = schemas.encode_ledger_cursor(entries[-1].created_at, entries[-1].id)
+    return {"entries": entries, "next_cursor": next_cursor}
 
 # --- SYSTEM AUDIT ENDPOINT (Step 7) ---
 
+# How stale /audit/integrity-check is allowed to be
+INTEGRITY_REFRESH_INTERVAL_SECONDS = 60
+
+async def refresh_integrity_view():
+    async with engine.begin() as conn:
+        await conn.execute(REFRESH_INTEGRITY_SQL)
+
+async def _refresh_integrity_view_forever():
+    while True:
+        try:
+            await refresh_integrity_view()
+        except Exception:
+            logger.exception("Failed to refresh %s", models.INTEGRITY_VIEW)
+        await asyncio.sleep(INTEGRITY_REFRESH_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def schedule_integrity_refresh():
+    # Keep a reference so the task isn't garbage collected while it sleeps
+    app.state.integrity_refresh_task = asyncio.create_task(_refresh_integrity_view_forever())
+
 @app.get("/audit/integrity-check")
-def integrity_check(db: Session = Depends(get_db)):
+async def integrity_check(db: AsyncSession = Depends(get_db)):
     """
     Verifies system-wide integrity.
-    Checks total liquidity and ensures every transaction has a balanced set of entries.
+    Checks total liquidity, ensures every transaction has a balanced set of entries and
+    reconciles stored balances against the ledger.
+
+    Results are read from a materialized view refreshed every
+    INTEGRITY_REFRESH_INTERVAL_SECONDS, so they reflect the ledger as of `as_of`.
     """
-    # 1. Total Liquidity: Sum(Credits) - Sum(Debits)
-    query = text("""
-        SELECT SUM(CASE WHEN entry_type = 'CREDIT' THEN amount ELSE -amount END)
-        FROM ledger_entries
-    """)
-    net_sum = db.execute(query).scalar()
-    
-    # 2. Transaction Balancing: Ensure every transaction has an even number of entries
-    # (Since every transfer MUST have 1 debit and 1 credit)
-    transfer_integrity_query = text("""
-        SELECT transaction_id 
-        FROM ledger_entries 
-        GROUP BY transaction_id 
-        HAVING (COUNT(*) % 2) != 0
-    """)
-    unbalanced_txs = db.execute(transfer_integrity_query).all()
+    snapshot = (await db.execute(INTEGRITY_SNAPSHOT_SQL)).one()
 
+    healthy = snapshot.unbalanced == 0 and snapshot.drifted == 0
     return {
-        "total_system_liquidity": float(net_sum or 0),
-        "unbalanced_transactions_count": len(unbalanced_txs),
-        "status": "Healthy" if len(unbalanced_txs) == 0 else "Integrity Compromised"
+        "total_system_liquidity": float(schemas.from_minor_units(snapshot.net_sum)),
+        "unbalanced_transactions_count": snapshot.unbalanced,
+        "drifted_accounts_count": snapshot.drifted,
+        "status": "Healthy" if healthy else "Integrity Compromised",
+        "as_of": snapshot.refreshed_at
     }
 
 # --- TRANSACTION ENDPOINTS (ACID PROTECTED) ---
 
 @app.post("/deposits")
-def deposit_funds(deposit: schemas.DepositRequest, db: Session = Depends(get_db)):
-    if deposit.amount <= 0:
-        raise HTTPException(status_code=400, detail="Amount must be positive")
-    
-    with db.begin():
-        new_tx = models.Transaction(type="DEPOSIT", description=deposit.description, status="COMPLETED")
-        db.add(new_tx)
-        db.flush()
-
-        entry = models.LedgerEntry(
-            account_id=deposit.account_id,
-            transaction_id=new_tx.id,
-            entry_type=EntryType.CREDIT,
-            amount=deposit.amount
-        )
-        db.add(entry)
+async def deposit_funds(deposit: schemas.DepositRequest, db: AsyncSession = Depends(get_db)):
+    amount = schemas.to_minor_units(deposit.amount)
+    async with db.begin():
+        await apply_balance_delta(db, deposit.account_id, amount)
+
+        await db.execute(RECORD_SINGLE_ENTRY_SQL, {
+            "tx_type": "DEPOSIT",
+            "description": deposit.description,
+            "account_id": deposit.account_id,
+            "entry_type": EntryType.CREDIT.value,
+            "amount": amount
+        })
+    await invalidate_accounts(deposit.account_id)
     return {"message": "Deposit successful"}
 
 @app.post("/withdrawals")
-def withdraw_funds(withdrawal: schemas.WithdrawalRequest, db: Session = Depends(get_db)):
-    if withdrawal.amount <= 0:
-        raise HTTPException(status_code=400, detail="Amount must be positive")
-
-    try:
-        with db.begin():
-            account = db.query(models.Account).filter(models.Account.id == withdrawal.account_id).with_for_update().first()
-            if not account:
-                raise HTTPException(status_code=404, detail="Account not found")
-
-            balance_query = text("""
-                SELECT COALESCE(SUM(CASE WHEN entry_type = 'CREDIT' THEN amount ELSE -amount END), 0)
-                FROM ledger_entries WHERE account_id = :acc_id
-            """)
-            current_balance = db.execute(balance_query, {"acc_id": withdrawal.account_id}).scalar()
-            
-            if current_balance < withdrawal.amount:
-                raise HTTPException(status_code=422, detail="Insufficient funds")
-
-            new_tx = models.Transaction(type="WITHDRAWAL", description=withdrawal.description, status="COMPLETED")
-            db.add(new_tx)
-            db.flush()
-
-            entry = models.LedgerEntry(
-                account_id=withdrawal.account_id,
-                transaction_id=new_tx.id,
-                entry_type=EntryType.DEBIT,
-                amount=withdrawal.amount
-            )
-            db.add(entry)
-        return {"message": "Withdrawal successful"}
-    except Exception as e:
-        if isinstance(e, HTTPException): raise e
-        raise HTTPException(status_code=500, detail=str(e))
+async def withdraw_funds(withdrawal: schemas.WithdrawalRequest, db: AsyncSession = Depends(get_db)):
+    amount = schemas.to_minor_units(withdrawal.amount)
+    async with db.begin():
+        await apply_balance_delta(db, withdrawal.account_id, -amount)
+
+        await db.execute(RECORD_SINGLE_ENTRY_SQL, {
+            "tx_type": "WITHDRAWAL",
+            "description": withdrawal.description,
+            "account_id": withdrawal.account_id,
+            "entry_type": EntryType.DEBIT.value,
+            "amount": amount
+        })
+    await invalidate_accounts(withdrawal.account_id)
+    return {"message": "Withdrawal successful"}
 
 @app.post("/transfers")
-def execute_transfer(transfer: schemas.TransferRequest, db: Session = Depends(get_db)):
-    if transfer.amount <= 0:
-        raise HTTPException(status_code=400, detail="Transfer amount must be positive")
-
-    try:
-        with db.begin():
-            source_account = db.query(models.Account).filter(models.Account.id == transfer.source_account_id).with_for_update().first()
-            if not source_account:
-                raise HTTPException(status_code=404, detail="Source account not found")
-
-            balance_query = text("""
-                SELECT COALESCE(SUM(CASE WHEN entry_type = 'CREDIT' THEN amount ELSE -amount END), 0)
-                FROM ledger_entries WHERE account_id = :acc_id
-            """)
-            source_balance = db.execute(balance_query, {"acc_id": transfer.source_account_id}).scalar()
-            
-            if source_balance < transfer.amount:
-                raise HTTPException(status_code=422, detail="Insufficient funds")
-
-            new_tx = models.Transaction(type="TRANSFER", description=transfer.description, status="COMPLETED")
-            db.add(new_tx)
-            db.flush()
-
-            debit_entry = models.LedgerEntry(
-                account_id=transfer.source_account_id, transaction_id=new_tx.id,
-                entry_type=EntryType.DEBIT, amount=transfer.amount
-            )
-            credit_entry = models.LedgerEntry(
-                account_id=transfer.destination_account_id, transaction_id=new_tx.id,
-                entry_type=EntryType.CREDIT, amount=transfer.amount
-            )
-            db.add_all([debit_entry, credit_entry])
-        
-        return {"message": "Transfer successful", "transaction_id": new_tx.id}
-    except Exception as e:
-        if isinstance(e, HTTPException): raise e
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+async def execute_transfer(transfer: schemas.TransferRequest, db: AsyncSession = Depends(get_db)):
+    amount = schemas.to_minor_units(transfer.amount)
+    async with db.begin():
+        # Both rows get locked, so take the locks in a fixed (id) order to avoid deadlocks
+        # between opposing transfers (A -> B racing B -> A).
+        legs = sorted([
+            (transfer.source_account_id, -amount, "Source account not found"),
+            (transfer.destination_account_id, amount, "Destination account not found"),
+        ], key=lambda leg: leg[0])
+        for account_id, delta, not_found in legs:
+            await apply_balance_delta(db, account_id, delta, not_found)
+
+        transaction_id = (await db.execute(RECORD_TRANSFER_SQL, {
+            "description": transfer.description,
+            "source_id": transfer.source_account_id,
+            "destination_id": transfer.destination_account_id,
+            "amount": amount
+        })).scalar_one()
+
+    await invalidate_accounts(transfer.source_account_id, transfer.destination_account_id)
+    return {"message": "Transfer successful", "transaction_id": transaction_id}
\ No newline at end of file
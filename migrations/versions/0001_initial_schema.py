@@ -0,0 +1,100 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-14 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UTC_NOW = sa.text("(clock_timestamp() AT TIME ZONE 'utc')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "accounts",
+        sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("account_type", sa.String(), nullable=False),
+        sa.Column("currency", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("balance", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "transactions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=UTC_NOW, nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "ledger_entries",
+        sa.Column("id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False),
+        sa.Column("account_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("transaction_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("entry_type", sa.Enum("DEBIT", "CREDIT", name="entrytype"), nullable=False),
+        sa.Column("amount", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=UTC_NOW, nullable=True),
+        sa.ForeignKeyConstraint(["account_id"], ["accounts.id"]),
+        sa.ForeignKeyConstraint(["transaction_id"], ["transactions.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ledger_acct_type", "ledger_entries", ["account_id", "entry_type"], postgresql_include=["amount"])
+    op.create_index("ix_ledger_acct_created", "ledger_entries", ["account_id", sa.text("created_at DESC")])
+    op.create_index("ix_ledger_tx", "ledger_entries", ["transaction_id"])
+
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_ledger_integrity AS
+        SELECT
+            1 AS id,
+            COALESCE(SUM(t.net), 0) AS net_sum,
+            COUNT(*) FILTER (WHERE t.cnt % 2 != 0) AS unbalanced,
+            (
+                SELECT COUNT(*)
+                FROM accounts a
+                WHERE a.balance != (
+                    SELECT COALESCE(SUM(amount) FILTER (WHERE entry_type = 'CREDIT'), 0)
+                         - COALESCE(SUM(amount) FILTER (WHERE entry_type = 'DEBIT'), 0)
+                    FROM ledger_entries
+                    WHERE account_id = a.id
+                )
+            ) AS drifted,
+            now() AS refreshed_at
+        FROM (
+            SELECT transaction_id,
+                   COUNT(*) AS cnt,
+                   COALESCE(SUM(amount) FILTER (WHERE entry_type = 'CREDIT'), 0)
+                 - COALESCE(SUM(amount) FILTER (WHERE entry_type = 'DEBIT'), 0) AS net
+            FROM ledger_entries
+            GROUP BY transaction_id
+        ) t
+    """)
+    # REFRESH ... CONCURRENTLY requires a unique index on the view
+    op.execute("CREATE UNIQUE INDEX ux_mv_ledger_integrity_id ON mv_ledger_integrity (id)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW mv_ledger_integrity")
+    op.drop_index("ix_ledger_tx", table_name="ledger_entries")
+    op.drop_index("ix_ledger_acct_created", table_name="ledger_entries")
+    op.drop_index("ix_ledger_acct_type", table_name="ledger_entries")
+    op.drop_table("ledger_entries")
+    op.drop_table("transactions")
+    op.drop_table("accounts")
+    sa.Enum(name="entrytype").drop(op.get_bind())
@@ -0,0 +1,29 @@
+"""name the entry type enum
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-14 17:12:47.132919
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Give the native enum an explicit, stable name instead of SQLAlchemy's derived default
+    op.execute("ALTER TYPE entrytype RENAME TO entry_type_enum")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TYPE entry_type_enum RENAME TO entrytype")
@@ -0,0 +1,46 @@
+"""account daily delta rollup
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-14 17:13:51.374614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "account_daily_delta",
+        sa.Column("account_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("net_delta", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["account_id"], ["accounts.id"]),
+        sa.PrimaryKeyConstraint("account_id", "day"),
+    )
+    # Seed the rollup from existing history so "balance as of day D" holds for past days too
+    op.execute("""
+        INSERT INTO account_daily_delta (account_id, day, net_delta)
+        SELECT account_id,
+               created_at::date,
+               COALESCE(SUM(amount) FILTER (WHERE entry_type = 'CREDIT'), 0)
+             - COALESCE(SUM(amount) FILTER (WHERE entry_type = 'DEBIT'), 0)
+        FROM ledger_entries
+        GROUP BY account_id, created_at::date
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("account_daily_delta")
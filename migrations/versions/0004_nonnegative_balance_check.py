@@ -0,0 +1,28 @@
+"""nonnegative balance check
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-14 17:16:02.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_check_constraint("ck_accounts_nonneg_balance", "accounts", "balance >= 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("ck_accounts_nonneg_balance", "accounts", type_="check")
@@ -0,0 +1,31 @@
+"""ledger history cursor index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-14 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Ledger pagination orders by (created_at, id); include id so the keyset scan stays index-ordered
+    op.drop_index("ix_ledger_acct_created", table_name="ledger_entries")
+    op.create_index("ix_ledger_acct_created", "ledger_entries", ["account_id", sa.text("created_at DESC"), sa.text("id DESC")])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ledger_acct_created", table_name="ledger_entries")
+    op.create_index("ix_ledger_acct_created", "ledger_entries", ["account_id", sa.text("created_at DESC")])
@@ -1,33 +1,74 @@
-import uuid
 import enum
-import datetime
-from sqlalchemy import Column, String, Numeric, ForeignKey, Enum, DateTime
+from sqlalchemy import Column, String, BigInteger, ForeignKey, Enum, DateTime, Date, Index, CheckConstraint, text
+from sqlalchemy.dialects.postgresql import UUID
 from database import Base
 
+# Primary keys are generated by Postgres (gen_random_uuid() is built in since PG 13)
+# and stored as native 16-byte uuids
+
+# Timestamps are filled in by Postgres too, so raw INSERTs get them without passing a parameter.
+# clock_timestamp() (not now()) orders rows written in one transaction, but is not unique at
+# microsecond resolution; ledger pagination breaks ties on id.
+UTC_NOW = text("(clock_timestamp() AT TIME ZONE 'utc')")
+
 class EntryType(enum.Enum):
     DEBIT = "DEBIT"
     CREDIT = "CREDIT"
 
+NONNEG_BALANCE_CONSTRAINT = "ck_accounts_nonneg_balance"
+
 class Account(Base):
     __tablename__ = "accounts"
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    __table_args__ = (
+        # Overdraft protection lives in the database, enforced atomically with each balance UPDATE
+        CheckConstraint("balance >= 0", name=NONNEG_BALANCE_CONSTRAINT),
+    )
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     user_id = Column(String, nullable=False)
     account_type = Column(String, nullable=False)
     currency = Column(String, default="USD")
     status = Column(String, default="ACTIVE")
+    balance = Column(BigInteger, nullable=False, default=0) # minor units, see schemas.MINOR_UNIT_PLACES
 
 class Transaction(Base):
     __tablename__ = "transactions"
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     type = Column(String, nullable=False) # TRANSFER, DEPOSIT, WITHDRAWAL
+    description = Column(String)
     status = Column(String, default="PENDING")
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
 
 class LedgerEntry(Base):
     __tablename__ = "ledger_entries"
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    account_id = Column(String, ForeignKey("accounts.id"), nullable=False)
-    transaction_id = Column(String, ForeignKey("transactions.id"), nullable=False)
-    entry_type = Column(Enum(EntryType), nullable=False)
-    amount = Column(Numeric(19, 4), nullable=False)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
\ No newline at end of file
+    __table_args__ = (
+        # Covers the per-account balance aggregate so it can be answered index-only
+        Index("ix_ledger_acct_type", "account_id", "entry_type", postgresql_include=["amount"]),
+        # Serves the ledger history ORDER BY / keyset cursor straight from the index (no sort node)
+        Index("ix_ledger_acct_created", "account_id", text("created_at DESC"), text("id DESC")),
+        # Lets the audit GROUP BY transaction_id walk the index instead of hashing a full scan
+        Index("ix_ledger_tx", "transaction_id"),
+    )
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id"), nullable=False)
+    transaction_id = Column(UUID(as_uuid=True), ForeignKey("transactions.id"), nullable=False)
+    entry_type = Column(Enum(EntryType, name="entry_type_enum", native_enum=True), nullable=False)
+    amount = Column(BigInteger, nullable=False) # minor units, see schemas.MINOR_UNIT_PLACES
+    created_at = Column(DateTime, server_default=UTC_NOW)
+
+class AccountDailyDelta(Base):
+    """
+    Per-account, per-day (UTC) net balance change, maintained by the statements that write the
+    ledger entries (see main.RECORD_*_SQL), keyed on each entry's own created_at.
+    Balance as of the end of day D = accounts.balance - SUM(net_delta) WHERE day > D,
+    which reads at most one row per day instead of the account's whole ledger.
+    """
+    __tablename__ = "account_daily_delta"
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    net_delta = Column(BigInteger, nullable=False) # minor units
+
+# --- Audit Snapshot ---
+# The integrity check scans the whole ledger, so it is precomputed into a materialized view
+# (created by the migrations, see migrations/versions) and refreshed periodically instead of
+# being recomputed on every audit request.
+INTEGRITY_VIEW = "mv_ledger_integrity"
\ No newline at end of file
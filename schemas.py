@@ -1,7 +1,28 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, BeforeValidator, ConfigDict, TypeAdapter, condecimal
+from typing import Annotated, Optional, List, Tuple
+from uuid import UUID
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, timezone
+
+# --- Money ---
+# Amounts are stored as BIGINT minor units (1 unit = 10^-4) and only become Decimal at the API edge.
+MINOR_UNIT_PLACES = 4
+
+def to_minor_units(amount: Decimal) -> int:
+    return int(amount.scaleb(MINOR_UNIT_PLACES))
+
+def from_minor_units(minor: int) -> Decimal:
+    return Decimal(minor).scaleb(-MINOR_UNIT_PLACES)
+
+# Balances and entry amounts are BIGINT columns, so no single amount may exceed int64 minor units
+MAX_MINOR_UNITS = 2**63 - 1
+MAX_AMOUNT = from_minor_units(MAX_MINOR_UNITS)
+
+# Read from the database in minor units, exposed as Decimal
+StoredAmount = Annotated[Decimal, BeforeValidator(from_minor_units)]
+# Accepted from clients: positive, at most MINOR_UNIT_PLACES decimals, and small enough to fit
+# a BIGINT once converted. Checked while parsing the request, before a DB session is acquired.
+RequestAmount = condecimal(gt=0, le=MAX_AMOUNT, decimal_places=MINOR_UNIT_PLACES)
 
 # --- Account Schemas ---
 class AccountCreate(BaseModel):
@@ -10,41 +31,61 @@ class AccountCreate(BaseModel):
     currency: str = "USD"
 
 class AccountResponse(BaseModel):
-    id: str
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
     user_id: str
     account_type: str
     currency: str
     status: str
-    balance: Decimal
-
-    class Config:
-        from_attributes = True
+    balance: StoredAmount
 
 # --- Ledger History Schema ---
 class LedgerEntryResponse(BaseModel):
-    id: str
-    account_id: str
-    transaction_id: str
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    account_id: UUID
+    transaction_id: UUID
     entry_type: str
-    amount: Decimal
+    amount: StoredAmount
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+class LedgerPage(BaseModel):
+    entries: List[LedgerEntryResponse]
+    # Opaque; pass back as `cursor` to fetch the next (older) page. None once history is exhausted
+    next_cursor: Optional[str] = None
+
+# Keyset cursor: (created_at, id) of the last entry on a page. created_at alone isn't unique,
+# so the id breaks ties and no entry is skipped at a page boundary.
+_cursor_timestamp = TypeAdapter(datetime)
+
+def encode_ledger_cursor(created_at: datetime, entry_id: UUID) -> str:
+    return f"{created_at.isoformat()}_{entry_id}"
+
+def decode_ledger_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Raises ValueError on malformed cursors. Aware timestamps are normalised to naive UTC like created_at."""
+    created_at, separator, entry_id = cursor.rpartition("_")
+    if not separator:
+        raise ValueError("cursor must be '<created_at>_<id>'")
+    timestamp = _cursor_timestamp.validate_python(created_at)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp, UUID(entry_id)
 
 # --- Transaction Schemas ---
 class TransferRequest(BaseModel):
-    source_account_id: str
-    destination_account_id: str
-    amount: Decimal
+    source_account_id: UUID
+    destination_account_id: UUID
+    amount: RequestAmount
     description: Optional[str] = "Internal Transfer"
 
 class DepositRequest(BaseModel):
-    account_id: str
-    amount: Decimal
+    account_id: UUID
+    amount: RequestAmount
     description: Optional[str] = "Cash Deposit"
 
 class WithdrawalRequest(BaseModel):
-    account_id: str
-    amount: Decimal
+    account_id: UUID
+    amount: RequestAmount
     description: Optional[str] = "Cash Withdrawal"
\ No newline at end of file
@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+
+import schemas
+
+
+def make_deposit(amount):
+    return schemas.DepositRequest(account_id="00000000-0000-0000-0000-000000000001", amount=amount)
+
+
+def test_max_amount_converts_to_bigint_max():
+    deposit = make_deposit(schemas.MAX_AMOUNT)
+    assert schemas.to_minor_units(deposit.amount) == 2**63 - 1
+
+
+@pytest.mark.parametrize("amount", [
+    schemas.MAX_AMOUNT + Decimal("0.0001"),
+    Decimal("999999999999999.9999"),
+    Decimal("0"),
+    Decimal("-1"),
+    Decimal("1.00001"),
+])
+def test_rejects_amounts_outside_minor_unit_range(amount):
+    with pytest.raises(ValidationError):
+        make_deposit(amount)
+
+
+def test_minor_unit_round_trip():
+    assert schemas.from_minor_units(schemas.to_minor_units(Decimal("12.3456"))) == Decimal("12.3456")